@@ -3,7 +3,10 @@
 # /// script
 # dependencies = ["anthropic"]
 # ///
-import curses, anthropic, re, sys, os
+import curses, anthropic, re, sys, os, difflib, threading, unicodedata
+from collections import deque
+from concurrent.futures import Future
+from itertools import zip_longest
 
 SYSTEM_PROMPT = """You are a self-editing document—a living Python program that modifies its own source.
 
@@ -13,8 +16,12 @@ Structure (separated by MARKER line):
 
 When using the respond tool:
 - edits: Each 'old' must match source EXACTLY (every character, space, newline) with enough context to be unique
+  All edits are matched against the source as given (not after earlier edits) and must not overlap
 - message: Your response (added as comments)
 
+If a <patch> follows the source, the kernel shown is an earlier version and the patch is a unified diff
+bringing it up to date. Edits must match the patched (current) source.
+
 Be concise. Never edit the MARKER line."""
 EDIT_TOOL = {"name": "respond", "description": "Respond with optional edits", "input_schema": {
     "type": "object",
@@ -28,8 +35,39 @@ EDIT_TOOL = {"name": "respond", "description": "Respond with optional edits", "i
 }}
 FILE = __file__
 MARKER = "# === CONVERSATION ==="
+_MARKER_SEP = '\n' + MARKER
 MODEL = "claude-sonnet-4-5-20250929"
 MAX_TOKENS = 4096
+_POLL_MS = 50  # getch timeout while an agent request is pending, so its reply is picked up
+_CLIENT = None
+
+def _client():
+    """Shared API client, so connections are pooled across agent calls."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = anthropic.Anthropic()
+    return _CLIENT
+
+def _reset_client():
+    """Drop the shared client, e.g. after a connection error left its pool broken."""
+    global _CLIENT
+    _CLIENT = None
+
+def _fit(line, width):
+    """Longest prefix of line that fits in width screen columns (tabs, ^X controls and wide chars included)."""
+    if line.isascii() and line.isprintable():
+        return line[:width]
+    col = 0
+    for i, ch in enumerate(line):
+        if ch == '\t':
+            col = (col // 8 + 1) * 8
+        elif ch < ' ' or ch == '\x7f' or unicodedata.east_asian_width(ch) in 'WF':
+            col += 2
+        else:
+            col += 1
+        if col > width:
+            return line[:i]
+    return line
 
 class Editor:
     def __init__(self, stdscr):
@@ -42,217 +80,419 @@ class Editor:
         self.cursor_y = self.cursor_x = self.scroll_y = 0
         self.status = "Ctrl+F: agent | Ctrl+R: reload | Ctrl+S: save | Ctrl+Q: quit"
         self.last_error = None
+        self._prev_visible = []
+        self._prev_status = None
+        self._prev_size = None
+        self._trim_cache = {}  # line index -> (line, line cut to the window width), for lines that need cutting
+        self._marker_line = None
+        self._agent_future = None
+        self._agent_kernel = self._agent_cursor = None  # kernel and cursor when the request was sent
+        self._agent_progress = deque(maxlen=1)  # latest partial message from the worker
+        self._sent_kernel = self._pending_kernel = None  # kernel last sent in full, and the one in flight
+        self._dirty = True
+        self._cached_kernel = ''
         self.load()
+        self._loaded_kernel = self._cached_kernel  # kernel the running class was built from
 
     def load(self):
-        with open(FILE) as f:
-            self.lines = f.read().split('\n')
+        with open(FILE, encoding='utf-8') as f:
+            text = f.read()
+        self._cached_kernel = text.partition(_MARKER_SEP)[0]
+        self.lines = text.split('\n')
+        self._invalidate_marker()
         self.cursor_y = len(self.lines) - 1
         self.cursor_x = len(self.lines[self.cursor_y]) if self.lines else 0
 
-    def validate(self, content):
-        """Validate content, return error message or None if valid."""
-        marker_matches = re.findall(r'^' + re.escape(MARKER) + r'$', content, re.MULTILINE)
-        if len(marker_matches) == 0:
+    def validate(self, content, check_syntax=True):
+        """Validate content, return error message or None if valid. check_syntax=False skips compiling the kernel."""
+        parts = content.split(_MARKER_SEP)
+        return self._check_marker(content, parts) or (self._check_syntax(parts[0]) if check_syntax else None)
+
+    def _check_marker(self, content, parts):
+        """parts is content split on _MARKER_SEP."""
+        # count whole MARKER lines: a split point followed by a newline, another split point or the end
+        markers = sum(1 for p in parts[1:] if not p or p[0] == '\n')
+        markers += content == MARKER or content.startswith(MARKER + '\n')
+        if markers == 0:
             return "Structure broken: MARKER missing"
-        if len(marker_matches) > 1:
+        if markers > 1:
             return "Structure broken: multiple MARKERs"
-        kernel = content.split('\n' + MARKER)[0]
+        return None
+
+    def _check_syntax(self, kernel):
         try:
             compile(kernel, FILE, 'exec')
         except SyntaxError as e:
             return f"Syntax error line {e.lineno}: {e.msg}"
         return None
 
-    def hot_reload(self):
-        """Reload kernel - swap __class__ to pick up new methods."""
+    def hot_reload(self, kernel=None):
+        """Reload kernel - swap __class__ to pick up new methods. Reads FILE unless given the kernel."""
         try:
-            with open(FILE) as f:
-                kernel = f.read().split('\n' + MARKER)[0]
+            if kernel is None:
+                with open(FILE, encoding='utf-8') as f:
+                    kernel = self._cached_kernel = f.read().partition(_MARKER_SEP)[0]
+            if kernel == self._loaded_kernel:
+                self.status = "Reloaded (cached)"
+                return True
             ns = {'__name__': '__main__', '__file__': FILE, 'curses': curses, 'anthropic': anthropic, 're': re, 'sys': sys, 'os': os}
             exec(compile(kernel, FILE, 'exec'), ns)
             self.__class__ = ns['Editor']
+            self._loaded_kernel = kernel
+            self._invalidate_marker()
             self.status = "Reloaded!"
             return True
         except Exception as e:
             self.status = f"Reload failed: {str(e)[:40]}"
             return False
 
-    def save(self, content=None):
+    def save(self, content=None, skip_validate=False):
+        """Write content (default: the buffer). skip_validate trusts an already-validated content."""
         if content is None:
             content = '\n'.join(self.lines)
-        error = self.validate(content)
+        new_kernel = content.partition(_MARKER_SEP)[0]
+        # the kernel on disk already compiles, so only a changed kernel needs compiling
+        kernel_changed = self._cached_kernel != new_kernel
+        error = None if skip_validate else self.validate(content, check_syntax=kernel_changed)
         if error:
             self.status = error[:60]
             return False, error
-        try:
-            with open(FILE) as f:
-                old_kernel = f.read().split('\n' + MARKER)[0]
-        except FileNotFoundError:
-            old_kernel = ""
-        new_kernel = content.split('\n' + MARKER)[0]
-        kernel_changed = old_kernel != new_kernel
-        with open(FILE, 'w') as f:
+        with open(FILE, 'w', encoding='utf-8') as f:
             f.write(content)
+        self._cached_kernel = new_kernel
         if kernel_changed:
-            self.hot_reload()
+            self.hot_reload(new_kernel)
         else:
             self.status = "Saved!"
         return True, None
 
+    def _invalidate_marker(self):
+        self._marker_line = None
+
+    def _set_line(self, y, text):
+        """Replace one line in place, dropping the marker cache if it was or becomes MARKER."""
+        if text == MARKER or self.lines[y] == MARKER:
+            self._invalidate_marker()
+        self.lines[y] = text
+
+    def _insert_line(self, y, text):
+        """Insert a line, shifting the cached marker index instead of dropping it."""
+        self.lines.insert(y, text)
+        if text == MARKER:
+            self._invalidate_marker()
+        elif self._marker_line is not None and 0 <= y <= self._marker_line:
+            self._marker_line += 1
+
+    def _delete_line(self, y):
+        """Delete a line, shifting the cached marker index instead of dropping it."""
+        del self.lines[y]
+        if self._marker_line is None or y > self._marker_line:
+            return
+        if y == self._marker_line:
+            self._invalidate_marker()
+        else:
+            self._marker_line -= 1
+
     def get_marker_line(self):
-        for i, line in enumerate(self.lines):
-            if line == MARKER:
-                return i
-        return -1
+        if self._marker_line is None:
+            self._marker_line = next((i for i, line in enumerate(self.lines) if line == MARKER), -1)
+        return self._marker_line
 
     def in_conversation_section(self):
         marker_line = self.get_marker_line()
         return marker_line >= 0 and self.cursor_y > marker_line
 
     def apply_edits(self, src, edits):
-        """Apply edits list. Returns (new_src, kernel_changed, error)."""
+        """Apply edits list, each matched against the original src. Returns (new_src, kernel_changed, error)."""
         if not edits:
             return src, False, None
-        kernel_before = src.split('\n' + MARKER)[0]
-        new_src = src
+        kernel_before = src.partition(_MARKER_SEP)[0]
+        spans = []
         for edit in edits:
             old, new = edit["old"], edit["new"]
-            count = new_src.count(old)
-            if count == 0:
+            idx = src.find(old)
+            if idx < 0:
                 return src, False, f"Edit not found: '{old[:30]}...'"
-            if count > 1:
-                return src, False, f"Edit ambiguous ({count}x): '{old[:20]}...'"
-            new_src = new_src.replace(old, new, 1)
-        error = self.validate(new_src)
+            if src.find(old, idx + 1) >= 0:
+                return src, False, f"Edit ambiguous ({src.count(old)}x): '{old[:20]}...'"
+            spans.append((idx, idx + len(old), new))
+        spans.sort(key=lambda span: span[0])
+        pieces, pos = [], 0
+        for start, end, new in spans:
+            if start < pos:
+                return src, False, f"Edits overlap at: '{src[start:start+20]}...'"
+            pieces += (src[pos:start], new)
+            pos = end
+        pieces.append(src[pos:])
+        new_src = ''.join(pieces)
+        kernel_after = new_src.partition(_MARKER_SEP)[0]
+        # compare against the saved kernel, not kernel_before: the buffer may hold unsaved broken code
+        error = self.validate(new_src, check_syntax=kernel_after != self._cached_kernel)
         if error:
             return src, False, f"Edit would cause: {error}"
-        kernel_after = new_src.split('\n' + MARKER)[0]
         return new_src, kernel_before != kernel_after, None
 
     def invoke_agent(self):
+        """Send the buffer to the agent on a worker thread; run() picks up the reply."""
+        if self._agent_future is not None:
+            return
         self.status = "Thinking..."
-        self.render()
-        curses.doupdate()
+        self._dirty = True
         src = '\n'.join(self.lines)
-        error_context = f"\n<error>{self.last_error}</error>\nPlease fix this." if self.last_error else ""
+        self._pending_kernel, content = self._agent_content(src)
+        self._agent_kernel = src.partition(_MARKER_SEP)[0]
+        self._agent_cursor = (self.cursor_y, self.cursor_x)
+        self._agent_progress.clear()
+        self._agent_future = self._start_worker(self._call_anthropic, content, self._agent_progress)
+
+    def _start_worker(self, fn, *args):
+        """Run fn on a daemon thread and return a Future for its result, so quitting never waits on a request."""
+        future = Future()
+        def work():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        threading.Thread(target=work, daemon=True).start()
+        return future
+
+    def _agent_content(self, src):
+        """Build the user message blocks. Returns (kernel sent in full, blocks).
+
+        The kernel last sent in full is repeated verbatim so it stays a prompt-cache hit, followed by a
+        patch up to the current kernel. Once the patch outgrows half the kernel, the current kernel is sent instead.
+        """
+        kernel, sep, conversation = src.partition(_MARKER_SEP)
+        base, patch = self._sent_kernel, ''
+        if base is not None and base != kernel:
+            patch = ''.join(difflib.unified_diff((base + '\n').splitlines(True), (kernel + '\n').splitlines(True), 'sent', 'current'))
+        if base is None or len(patch) > len(kernel) // 2:
+            base, patch = kernel, ''
+        tail = f"{sep}{conversation}\n</source>"
+        if patch:
+            tail += f"\n<patch>\n{patch}</patch>"
+        if self.last_error:
+            tail += f"\n<error>{self.last_error}</error>\nPlease fix this."
+        # cache breakpoints: this kernel block and the system block (which also covers the tool schema ahead of it)
+        return base, [
+            {"type": "text", "text": f"<source>\n{base}", "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": tail},
+        ]
+
+    def _call_anthropic(self, content, progress):
+        """Worker thread: stream the reply, pushing the partial message onto progress. Never touches editor state."""
+        with _client().messages.stream(
+            model=MODEL, max_tokens=MAX_TOKENS,
+            system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+            tools=[EDIT_TOOL],
+            tool_choice={"type": "tool", "name": "respond"},
+            messages=[{"role": "user", "content": content}]
+        ) as stream:
+            # the tool is forced, so the message arrives as tool input JSON rather than text
+            for event in stream:
+                if event.type == "input_json" and isinstance(event.snapshot, dict):
+                    progress.append(event.snapshot.get("message", ""))
+            return stream.get_final_message()
+
+    def poll_agent(self):
+        """Show streamed progress and apply the reply once the worker is done (main thread)."""
+        if self._agent_future is None:
+            return
+        if self._agent_future.done():
+            self.finish_agent()
+        elif self._agent_progress:
+            partial = self._agent_progress.pop().rstrip().rsplit('\n', 1)[-1]
+            if partial:
+                self.status = f"Thinking... {partial[-50:]}"
+                self._dirty = True
+
+    def finish_agent(self):
+        """Apply a completed agent reply to the buffer (main thread)."""
+        future, self._agent_future = self._agent_future, None
+        self._dirty = True
         try:
-            response = anthropic.Anthropic().messages.create(
-                model=MODEL, max_tokens=MAX_TOKENS,
-                system=SYSTEM_PROMPT,
-                tools=[EDIT_TOOL],
-                tool_choice={"type": "tool", "name": "respond"},
-                messages=[{"role": "user", "content": f"<source>\n{src}\n</source>{error_context}"}]
-            )
+            response = future.result()
             tool_input = next((b.input for b in response.content if b.type == "tool_use"), None)
             if not tool_input:
                 self.status = "No tool response"
                 return
             edits = tool_input.get("edits", [])
             message = tool_input.get("message", "")
+            # apply against the current buffer so conversation typed while waiting is kept, but never
+            # validate or save kernel edits the user made meanwhile as part of the agent's turn
+            src = '\n'.join(self.lines)
+            if src.partition(_MARKER_SEP)[0] != self._agent_kernel:
+                self.status = "Reply dropped: kernel edited while waiting"
+                return
             new_src, kernel_changed, error = self.apply_edits(src, edits)
             if error:
                 self.last_error = error
                 self.status = f"Edit failed: {error[:50]}"
                 return
             self.last_error = None
+            prefixed = ''
             if message:
-                prefixed = '\n'.join('# ' + line if line else '#' for line in message.split('\n'))
+                # empty lines become a bare '#'; replace twice because back-to-back ones overlap
+                prefixed = '# ' + message.replace('\n', '\n# ')
+                prefixed = prefixed.replace('\n# \n', '\n#\n').replace('\n# \n', '\n#\n')
+                if prefixed.startswith('# \n'):
+                    prefixed = '#' + prefixed[2:]
+                if prefixed.endswith('\n# '):
+                    prefixed = prefixed[:-1]
                 new_src = new_src.rstrip() + '\n#\n' + prefixed
             self.lines = new_src.split('\n')
-            success, save_error = self.save(new_src)
+            self._invalidate_marker()
+            # apply_edits validated new_src if there were edits; appended comments can only break it with a MARKER
+            success, save_error = self.save(new_src, skip_validate=bool(edits) and MARKER not in prefixed)
             if success:
                 self.status = "Agent responded!"
+                self._sent_kernel = self._pending_kernel
             else:
                 self.last_error = save_error
-            self.cursor_y = len(self.lines) - 1
-            self.cursor_x = 0
+            if (self.cursor_y, self.cursor_x) == self._agent_cursor:
+                self.cursor_y, self.cursor_x = len(self.lines) - 1, 0
+            else:  # the user moved on while waiting; leave the cursor where it is
+                self.cursor_y = min(self.cursor_y, len(self.lines) - 1)
+                self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
+        except anthropic.APIConnectionError as e:
+            _reset_client()
+            self.status = f"Error: {str(e)[:40]}"
         except Exception as e:
             self.status = f"Error: {str(e)[:40]}"
 
     def render(self):
-        self.stdscr.erase()
+        """Redraw only the rows that changed since the last frame."""
         h, w = self.stdscr.getmaxyx()
+        if (h, w) != self._prev_size:
+            self.stdscr.erase()
+            self._prev_visible, self._prev_status, self._prev_size = [], None, (h, w)
+            self._trim_cache.clear()
         if self.cursor_y < self.scroll_y:
             self.scroll_y = self.cursor_y
         if self.cursor_y >= self.scroll_y + h - 2:
             self.scroll_y = self.cursor_y - h + 3
-        for i in range(h - 2):
-            idx = i + self.scroll_y
-            if idx < len(self.lines):
-                try:
-                    self.stdscr.addstr(i, 0, self.lines[idx][:w-1])
-                except curses.error:
-                    pass
-        try:
-            status = f" {self.status} | Line {self.cursor_y+1}:{self.cursor_x+1} "
-            self.stdscr.addstr(h-1, 0, status[:w-1].ljust(w-1), curses.A_REVERSE)
-        except curses.error:
-            pass
+        lines, n, w1, cache = self.lines, len(self.lines), w - 1, self._trim_cache
+        new_visible = []
+        for idx in range(self.scroll_y, self.scroll_y + h - 2):
+            line = lines[idx] if idx < n else ''
+            if len(line) > w1 or not (line.isascii() and line.isprintable()):
+                # edits replace the line object, so an identity check is enough to spot a stale entry
+                hit = cache.get(idx)
+                if hit is None or hit[0] is not line:
+                    hit = cache[idx] = (line, _fit(line, w1))
+                line = hit[1]
+            new_visible.append(line)
+        for i, (old, new) in enumerate(zip_longest(self._prev_visible, new_visible)):
+            if old == new:
+                continue
+            try:
+                self.stdscr.move(i, 0)
+                self.stdscr.clrtoeol()
+                self.stdscr.addstr(i, 0, new)
+            except curses.error:
+                pass
+        self._prev_visible = new_visible
+        status = f" {self.status} | Line {self.cursor_y+1}:{self.cursor_x+1} "
+        if status != self._prev_status:
+            try:
+                self.stdscr.addstr(h-1, 0, status[:w-1].ljust(w-1), curses.A_REVERSE)
+            except curses.error:
+                pass
+            self._prev_status = status
         sy = self.cursor_y - self.scroll_y
         if 0 <= sy < h - 1:
             self.stdscr.move(sy, min(self.cursor_x, w-1))
         self.stdscr.noutrefresh()
 
     def handle_key(self, key):
-        h, w = self.stdscr.getmaxyx()
-        if key == curses.KEY_UP and self.cursor_y > 0:
-            self.cursor_y -= 1
-            self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
-        elif key == curses.KEY_DOWN and self.cursor_y < len(self.lines) - 1:
-            self.cursor_y += 1
-            self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
-        elif key == curses.KEY_LEFT and self.cursor_x > 0:
-            self.cursor_x -= 1
-        elif key == curses.KEY_RIGHT and self.cursor_x < len(self.lines[self.cursor_y]):
-            self.cursor_x += 1
+        if key == -1:  # getch timeout, nothing to do
+            return True
+        self._dirty = True
+        lines, cy, cx = self.lines, self.cursor_y, self.cursor_x
+        ln = lines[cy] if 0 <= cy < len(lines) else ''
+        if key == curses.KEY_UP and cy > 0:
+            cy -= 1
+            cx = min(cx, len(lines[cy]))
+        elif key == curses.KEY_DOWN and cy < len(lines) - 1:
+            cy += 1
+            cx = min(cx, len(lines[cy]))
+        elif key == curses.KEY_LEFT and cx > 0:
+            cx -= 1
+        elif key == curses.KEY_RIGHT and cx < len(ln):
+            cx += 1
         elif key in (curses.KEY_BACKSPACE, 127, 8):
-            if self.cursor_x > 0:
-                ln = self.lines[self.cursor_y]
-                self.lines[self.cursor_y] = ln[:self.cursor_x-1] + ln[self.cursor_x:]
-                self.cursor_x -= 1
-            elif self.cursor_y > 0:
-                self.cursor_x = len(self.lines[self.cursor_y - 1])
-                self.lines[self.cursor_y - 1] += self.lines[self.cursor_y]
-                del self.lines[self.cursor_y]
-                self.cursor_y -= 1
+            if cx > 0:
+                self._set_line(cy, ln[:cx-1] + ln[cx:])
+                cx -= 1
+            elif cy > 0:
+                cx = len(lines[cy - 1])
+                self._set_line(cy - 1, lines[cy - 1] + ln)
+                self._delete_line(cy)
+                cy -= 1
         elif key == curses.KEY_DC:
-            ln = self.lines[self.cursor_y]
-            if self.cursor_x < len(ln):
-                self.lines[self.cursor_y] = ln[:self.cursor_x] + ln[self.cursor_x+1:]
-            elif self.cursor_y < len(self.lines) - 1:
-                self.lines[self.cursor_y] += self.lines[self.cursor_y + 1]
-                del self.lines[self.cursor_y + 1]
+            if cx < len(ln):
+                self._set_line(cy, ln[:cx] + ln[cx+1:])
+            elif cy < len(lines) - 1:
+                self._set_line(cy, ln + lines[cy + 1])
+                self._delete_line(cy + 1)
         elif key in (10, 13):
-            ln = self.lines[self.cursor_y]
-            self.lines[self.cursor_y] = ln[:self.cursor_x]
-            remainder = ln[self.cursor_x:]
+            self._set_line(cy, ln[:cx])
+            remainder = ln[cx:]
             if self.in_conversation_section():
                 if remainder and not remainder.startswith('#'):
                     remainder = '# ' + remainder.lstrip()
                 elif not remainder:
                     remainder = '# '
-            self.lines.insert(self.cursor_y + 1, remainder)
-            self.cursor_y += 1
-            self.cursor_x = 2 if self.in_conversation_section() else 0
+            self._insert_line(cy + 1, remainder)
+            cy += 1
+            self.cursor_y = cy  # in_conversation_section reads the new cursor line
+            cx = 2 if self.in_conversation_section() else 0
         elif key == 19: self.save()  # Ctrl+S
         elif key == 17: return False  # Ctrl+Q
         elif key == 18: self.hot_reload()  # Ctrl+R
         elif key == 6: self.invoke_agent()  # Ctrl+F
         elif 32 <= key <= 126:
-            ln = self.lines[self.cursor_y]
-            self.lines[self.cursor_y] = ln[:self.cursor_x] + chr(key) + ln[self.cursor_x:]
-            self.cursor_x += 1
+            self.insert_text(chr(key))
+            return True  # insert_text already moved the cursor
+        self.cursor_y, self.cursor_x = cy, cx
         return True
 
+    def insert_text(self, text):
+        """Insert typed text at the cursor in one splice."""
+        self._dirty = True
+        ln = self.lines[self.cursor_y]
+        self._set_line(self.cursor_y, ln[:self.cursor_x] + text + ln[self.cursor_x:])
+        self.cursor_x += len(text)
+
+    def read_typed(self, key):
+        """Drain printable keys already queued after key (e.g. a paste); the first other key is pushed back."""
+        chars = [chr(key)]
+        self.stdscr.timeout(0)
+        while True:
+            k = self.stdscr.getch()
+            if not 32 <= k <= 126:
+                if k != -1:
+                    curses.ungetch(k)
+                break
+            chars.append(chr(k))
+        return ''.join(chars)
+
     def run(self):
         curses.raw()
         self.stdscr.keypad(True)
         curses.curs_set(1)
         while True:
-            self.render()
-            curses.doupdate()
-            if not self.handle_key(self.stdscr.getch()):
+            self.poll_agent()
+            if self._dirty:
+                self.render()
+                curses.doupdate()
+                self._dirty = False
+            # only wake up periodically while a reply is pending; otherwise block on input
+            self.stdscr.timeout(_POLL_MS if self._agent_future is not None else -1)
+            key = self.stdscr.getch()
+            if 32 <= key <= 126:
+                self.insert_text(self.read_typed(key))
+            elif not self.handle_key(key):
                 break
 
 if __name__ == "__main__":